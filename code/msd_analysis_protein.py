@@ -4,17 +4,41 @@ msd_analysis_protein.py
 This Python script simulates Brownian motion of a protein-sized particle in a fluid medium, using either 
 the underdamped or overdamped Langevin equation depending on user input. It models stochastic motion due to 
 thermal fluctuations and viscous drag, calculates the mean squared displacement (MSD), and plots the log-log plot of MSD versus time.
+"""
 
 import numpy as np
 import matplotlib.pyplot as plt
-
-def get_user_inputs():
+import scipy.fft
+from numba import njit
+
+# Use CuPy only if it imports and a CUDA device is actually usable; a CPU-only
+# install or a driver mismatch falls back to scipy.fft
+try:
+    import cupy
+    if cupy.cuda.runtime.getDeviceCount() == 0:
+        cupy = None
+except Exception:
+    cupy = None
+
+# Guessed, not benchmarked: below this length the host-device copies are assumed
+# to cost more than the FFT saves
+_GPU_MIN_LENGTH = 100_000
+
+def get_user_inputs(params=None):
     """
     Prompt the user for simulation parameters.
 
+    Args:
+        params (dict, optional): Pre-set parameters with the same keys as the prompts
+            produce. When given (even empty), no prompts are shown, so batch runs can
+            call main().
+
     Returns:
         dict: Dictionary of input parameters.
     """
+    if params is not None:
+        return params
+
     inputs = {
         'mass': float(input("Enter the mass of the particle (kg): ")),
         'radius': float(input("Enter the radius of the particle (m): ")),
@@ -47,32 +71,46 @@ def initialize_parameters(inputs):
 
     return gamma, D, N, time, kB, T_kelvin
 
-def simulate_underdamped(inputs, gamma, N, kB, T_kelvin):
+@njit(cache=True, fastmath=True)
+def _underdamped_kernel(N, dt, mass, gamma, sigma, x0, y0, noise):
     """
-    Simulate underdamped Langevin dynamics.
+    Integrate underdamped Langevin dynamics in compiled code.
+
+    Args:
+        sigma (float): Amplitude of the random force, sqrt(2 * gamma * kB * T / dt).
+        noise (np.ndarray): Standard normal draws of shape (N-1, 2), one (x, y) pair per step.
 
     Returns:
         tuple: Position arrays x, y
     """
-    np.random.seed(42)
-    dt = inputs['dt']
-    mass = inputs['mass']
-
-    x, y = np.zeros(N), np.zeros(N)
-    vx, vy = np.zeros(N), np.zeros(N)
-    x[0], y[0] = inputs['x0'], inputs['y0']
+    x, y = np.empty(N), np.empty(N)
+    x[0], y[0] = x0, y0
+    vx, vy = 0.0, 0.0
 
     for i in range(1, N):
-        fx = -gamma * vx[i-1] + np.sqrt(2 * gamma * kB * T_kelvin / dt) * np.random.randn()
-        fy = -gamma * vy[i-1] + np.sqrt(2 * gamma * kB * T_kelvin / dt) * np.random.randn()
-        ax, ay = fx / mass, fy / mass
-        vx[i] = vx[i-1] + ax * dt
-        vy[i] = vy[i-1] + ay * dt
-        x[i] = x[i-1] + vx[i] * dt
-        y[i] = y[i-1] + vy[i] * dt
+        fx = -gamma * vx + sigma * noise[i-1, 0]
+        fy = -gamma * vy + sigma * noise[i-1, 1]
+        vx += fx / mass * dt
+        vy += fy / mass * dt
+        x[i] = x[i-1] + vx * dt
+        y[i] = y[i-1] + vy * dt
 
     return x, y
 
+def simulate_underdamped(inputs, gamma, N, kB, T_kelvin):
+    """
+    Simulate underdamped Langevin dynamics.
+
+    Returns:
+        tuple: Position arrays x, y
+    """
+    rng = np.random.default_rng(42)
+    dt = inputs['dt']
+    sigma = np.sqrt(2 * gamma * kB * T_kelvin / dt)
+    noise = rng.standard_normal((N - 1, 2))
+    return _underdamped_kernel(N, dt, inputs['mass'], gamma, sigma,
+                               inputs['x0'], inputs['y0'], noise)
+
 def simulate_overdamped(inputs, D, N):
     """
     Simulate overdamped Langevin dynamics.
@@ -80,17 +118,69 @@ def simulate_overdamped(inputs, D, N):
     Returns:
         tuple: Position arrays x, y
     """
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     dt = inputs['dt']
 
-    x, y = np.zeros(N), np.zeros(N)
-    x[0], y[0] = inputs['x0'], inputs['y0']
+    # Increments are iid Gaussians; rows of (x, y) pairs keep the per-step draw order
+    dr = np.zeros((N, 2))
+    dr[1:] = rng.standard_normal((N - 1, 2))
+    r = np.cumsum(dr, axis=0) * np.sqrt(2 * D * dt)
 
-    for i in range(1, N):
-        x[i] = x[i-1] + np.sqrt(2 * D * dt) * np.random.randn()
-        y[i] = y[i-1] + np.sqrt(2 * D * dt) * np.random.randn()
+    return inputs['x0'] + r[:, 0], inputs['y0'] + r[:, 1]
 
-    return x, y
+def _autocorrelation(r):
+    """
+    Compute the autocorrelation of a signal using the Wiener-Khinchin theorem.
+
+    For a complex signal x + 1j*y the real part of the autocorrelation is
+    returned, which equals the sum of the x and y autocorrelations. Long
+    signals are transformed on the GPU when CuPy and a CUDA device are available.
+
+    Args:
+        r (np.ndarray): Real or complex signal array.
+
+    Returns:
+        np.ndarray: Autocorrelation averaged over the N - lag available pairs at each lag.
+    """
+    N = len(r)
+    if N == 0:
+        return np.zeros(0)
+    if cupy is not None and N >= _GPU_MIN_LENGTH:
+        xp, fft = cupy, cupy.fft
+        r = cupy.asarray(r)
+    else:
+        xp, fft = np, scipy.fft
+
+    # Zero-pad to at least 2N so the circular correlation does not wrap around,
+    # rounded up to a length with only small prime factors
+    if xp.iscomplexobj(r):
+        n_fft = scipy.fft.next_fast_len(2 * N)
+        F = fft.fft(r, n=n_fft)
+        acf = fft.ifft(F * xp.conj(F))[:N].real
+    else:
+        n_fft = scipy.fft.next_fast_len(2 * N, real=True)
+        F = fft.rfft(r, n=n_fft)
+        acf = fft.irfft(F * xp.conj(F), n=n_fft)[:N]
+    acf = acf / (N - xp.arange(N))
+
+    if xp is not np:
+        acf = cupy.asnumpy(acf)
+    return acf
+
+def _mean_square_pairs(sq):
+    """
+    Compute S1(lag), the mean of sq[i] + sq[i+lag] over all pairs at each lag.
+
+    Args:
+        sq (np.ndarray): Squared distance from the origin at each timestep.
+
+    Returns:
+        np.ndarray: S1 as a function of time lag.
+    """
+    N = len(sq)
+    lags = np.arange(N)
+    csq = np.concatenate(([0.0], np.cumsum(sq)))
+    return (csq[N - lags] + csq[N] - csq[lags]) / (N - lags)
 
 def compute_msd(r):
     """
@@ -102,12 +192,59 @@ def compute_msd(r):
     Returns:
         np.ndarray: MSD as a function of time lag.
     """
-    N = len(r)
-    msd = np.zeros(N)
-    for lag in range(1, N):
-        diffs = r[lag:] - r[:-lag]
-        msd[lag] = np.mean(diffs**2)
-    return msd
+    if len(r) == 0:
+        return np.zeros(0)
+
+    # MSD is translation invariant; centering keeps S1 - 2*S2 from cancelling badly
+    r = r - np.mean(r)
+
+    # MSD(lag) = S1(lag) - 2*S2(lag), with S2 the position autocorrelation
+    return _mean_square_pairs(r**2) - 2 * _autocorrelation(r)
+
+def compute_msd_2d(x, y):
+    """
+    Compute the total mean squared displacement (MSD) of a 2D trajectory.
+
+    Equivalent to compute_msd(x) + compute_msd(y), but both axes share one
+    complex FFT of z = x + 1j*y for the autocorrelation term.
+
+    Args:
+        x (np.ndarray): x position array.
+        y (np.ndarray): y position array.
+
+    Returns:
+        np.ndarray: Total MSD as a function of time lag.
+    """
+    if len(x) == 0:
+        return np.zeros(0)
+
+    z = x + 1j * y
+    z -= np.mean(z)
+    return _mean_square_pairs(np.abs(z)**2) - 2 * _autocorrelation(z)
+
+def _linear_fit(x, y):
+    """
+    Closed-form least-squares fit of a straight line.
+
+    Args:
+        x (np.ndarray): Independent variable.
+        y (np.ndarray): Dependent variable.
+
+    Returns:
+        tuple: (slope, intercept) of the best-fit line.
+
+    Raises:
+        ValueError: If fewer than two points, or only a single distinct x, are given.
+    """
+    if len(x) < 2:
+        raise ValueError(f"Need at least 2 points for a linear fit, got {len(x)}")
+    dx = x - x.mean()
+    ss_x = np.dot(dx, dx)
+    if ss_x == 0:
+        raise ValueError("Cannot fit a line: all x values are identical")
+    slope = np.dot(dx, y - y.mean()) / ss_x
+    intercept = y.mean() - slope * x.mean()
+    return slope, intercept
 
 def compute_log_slope(time, msd_total, fit_range=(0.1, 1.0)):
     """
@@ -119,7 +256,8 @@ def compute_log_slope(time, msd_total, fit_range=(0.1, 1.0)):
         fit_range (tuple): (t_min, t_max) for fitting in seconds.
 
     Returns:
-        float: Slope of log10(MSD) vs log10(time) in the specified range.
+        tuple: Slope of log10(MSD) vs log10(time) in the specified range, and
+            (log_time, log_msd, log_msd_fit) with the fitted line evaluated at log_time.
     """
     # Filter based on time range
     mask = (time > fit_range[0]) & (time < fit_range[1])
@@ -127,8 +265,9 @@ def compute_log_slope(time, msd_total, fit_range=(0.1, 1.0)):
     log_msd = np.log10(msd_total[mask])
 
     # Linear fit
-    slope, intercept = np.polyfit(log_time, log_msd, 1)
-    return slope, (log_time, log_msd)
+    slope, intercept = _linear_fit(log_time, log_msd)
+    log_msd_fit = slope * log_time + intercept
+    return slope, (log_time, log_msd, log_msd_fit)
 
 def plot_log_msd(time, msd_total, slope, fit_data):
     """
@@ -138,14 +277,14 @@ def plot_log_msd(time, msd_total, slope, fit_data):
         time (np.ndarray): Time array.
         msd_total (np.ndarray): Total MSD array.
         slope (float): Fitted slope of log-log MSD.
-        fit_data (tuple): (log_time, log_msd) used in fitting.
+        fit_data (tuple): (log_time, log_msd, log_msd_fit) from compute_log_slope.
     """
     log_time_full = np.log10(time[1:])
     log_msd_full = np.log10(msd_total[1:])
     
-    plt.figure(figsize=(8, 5))
+    fig = plt.figure(figsize=(8, 5))
     plt.plot(log_time_full, log_msd_full, label='log10(MSD_total)', linewidth=2)
-    plt.plot(fit_data[0], np.poly1d(np.polyfit(fit_data[0], fit_data[1], 1))(fit_data[0]), 'r--', label=f'Fit Slope = {slope:.2f}')
+    plt.plot(fit_data[0], fit_data[2], 'r--', label=f'Fit Slope = {slope:.2f}')
     plt.xlabel("log10(Time) [s]")
     plt.ylabel("log10(MSD) [m²]")
     plt.title("Simulated Brownian Motion: log(MSD) vs log(Time)")
@@ -153,9 +292,24 @@ def plot_log_msd(time, msd_total, slope, fit_data):
     plt.legend()
     plt.tight_layout()
     plt.show()
+    plt.close(fig)
+
+def main(params=None, plot=None):
+    """
+    Run a simulation, print the log-log MSD slope and optionally plot it.
+
+    Args:
+        params (dict, optional): Simulation parameters; prompts for them when omitted.
+        plot (bool, optional): Whether to show the MSD plot. Defaults to plotting only
+            for interactive runs, so batch calls with params never open a figure.
+
+    Returns:
+        float: Slope of log10(MSD) vs log10(time).
+    """
+    if plot is None:
+        plot = params is None
 
-def main():
-    inputs = get_user_inputs()
+    inputs = get_user_inputs(params)
     gamma, D, N, time, kB, T_kelvin = initialize_parameters(inputs)
 
     if inputs['is_underdamped']:
@@ -163,14 +317,14 @@ def main():
     else:
         x, y = simulate_overdamped(inputs, D, N)
 
-    msd_x = compute_msd(x)
-    msd_y = compute_msd(y)
-    msd_total = msd_x + msd_y
+    msd_total = compute_msd_2d(x, y)
 
     slope, fit_data = compute_log_slope(time[1:], msd_total[1:], fit_range=(time[1], time[-1] / 10))
     print(f"Estimated slope of log-log MSD: {slope:.3f}")
 
-    plot_log_msd(time, msd_total, slope, fit_data)
+    if plot:
+        plot_log_msd(time, msd_total, slope, fit_data)
+    return slope
 
 if __name__ == "__main__":
     main()
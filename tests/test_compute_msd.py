@@ -0,0 +1,135 @@
+import os
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'code'))  # To import from code directory
+
+import msd_analysis_protein
+from msd_analysis_protein import compute_msd, compute_msd_2d, compute_log_slope, get_user_inputs, main
+
+
+def msd_direct(r):
+    """Reference O(N^2) MSD: average squared displacement at every lag."""
+    N = len(r)
+    msd = np.zeros(N)
+    for lag in range(1, N):
+        msd[lag] = np.mean((r[lag:] - r[:-lag])**2)
+    return msd
+
+
+@pytest.mark.parametrize("N", [3, 10, 257, 1000])
+def test_compute_msd_matches_direct_loop(N):
+    rng = np.random.default_rng(N)
+    # Large offset relative to the step size stresses the S1 - 2*S2 cancellation
+    r = 1e3 + np.cumsum(rng.standard_normal(N))
+
+    msd = compute_msd(r)
+
+    assert msd.shape == (N,)
+    assert np.allclose(msd, msd_direct(r), rtol=1e-8, atol=1e-8)
+
+
+def test_compute_msd_empty():
+    msd = compute_msd(np.zeros(0))
+    assert msd.shape == (0,)
+
+
+@pytest.mark.parametrize("r", [[5.0], [5.0, 7.0]])
+def test_compute_msd_short(r):
+    r = np.array(r)
+    assert np.allclose(compute_msd(r), msd_direct(r), atol=1e-12)
+
+
+@pytest.mark.parametrize("N", [3, 10, 257, 1000])
+def test_compute_msd_2d_matches_per_axis(N):
+    rng = np.random.default_rng(N)
+    x = 1e3 + np.cumsum(rng.standard_normal(N))
+    y = -5e2 + np.cumsum(rng.standard_normal(N))
+
+    msd = compute_msd_2d(x, y)
+
+    assert msd.shape == (N,)
+    assert np.allclose(msd, compute_msd(x) + compute_msd(y), rtol=1e-8, atol=1e-8)
+    assert np.allclose(msd, msd_direct(x) + msd_direct(y), rtol=1e-8, atol=1e-8)
+
+
+def test_compute_msd_2d_empty():
+    msd = compute_msd_2d(np.zeros(0), np.zeros(0))
+    assert msd.shape == (0,)
+
+
+@pytest.mark.parametrize("x, y", [([5.0], [1.0]), ([5.0, 7.0], [1.0, -2.0])])
+def test_compute_msd_2d_short(x, y):
+    x, y = np.array(x), np.array(y)
+    assert np.allclose(compute_msd_2d(x, y), msd_direct(x) + msd_direct(y), atol=1e-12)
+
+
+def test_compute_log_slope_recovers_power_law():
+    time = np.linspace(0, 10, 1001)[1:]
+    slope, fit_data = compute_log_slope(time, 4 * time**1.5, fit_range=(0.1, 1.0))
+    assert np.isclose(slope, 1.5)
+    assert np.allclose(fit_data[2], fit_data[1])
+
+
+@pytest.mark.parametrize("fit_range", [(5, 6), (0.09, 0.11)])
+def test_compute_log_slope_rejects_too_few_points(fit_range):
+    time = np.linspace(0, 1, 11)[1:]
+    with pytest.raises(ValueError):
+        compute_log_slope(time, time, fit_range=fit_range)
+
+
+BATCH_PARAMS = {
+    'mass': 1e-20,
+    'radius': 1e-7,
+    'x0': 0.0,
+    'y0': 0.0,
+    'dt': 1e-3,
+    'T': 1.0,
+    'is_underdamped': False,
+}
+
+
+def test_main_with_params_does_not_plot():
+    plt.close('all')
+    for _ in range(3):
+        slope = main(BATCH_PARAMS)
+    assert np.isfinite(slope)
+    assert plt.get_fignums() == []
+
+
+def test_main_closes_plot_after_showing():
+    plt.close('all')
+    main(BATCH_PARAMS, plot=True)
+    assert plt.get_fignums() == []
+
+
+def test_get_user_inputs_never_prompts_for_a_dict(monkeypatch):
+    def no_input(prompt=""):
+        raise AssertionError("get_user_inputs read stdin")
+
+    monkeypatch.setattr("builtins.input", no_input)
+    assert get_user_inputs({}) == {}
+    assert get_user_inputs(BATCH_PARAMS) is BATCH_PARAMS
+
+
+@pytest.mark.parametrize("complex_input", [False, True])
+def test_autocorrelation_gpu_matches_cpu(monkeypatch, complex_input):
+    pytest.importorskip("cupy")
+    if msd_analysis_protein.cupy is None:
+        pytest.skip("no usable CUDA device")
+
+    rng = np.random.default_rng(0)
+    x = 1e3 + np.cumsum(rng.standard_normal(1000))
+    y = np.cumsum(rng.standard_normal(1000))
+    cpu = compute_msd_2d(x, y) if complex_input else compute_msd(x)
+
+    monkeypatch.setattr(msd_analysis_protein, "_GPU_MIN_LENGTH", 1)
+    gpu = compute_msd_2d(x, y) if complex_input else compute_msd(x)
+
+    assert isinstance(gpu, np.ndarray)
+    assert np.allclose(gpu, cpu, rtol=1e-8, atol=1e-8)